@@ -66,6 +66,8 @@ GENERATING_MUSIC = os.path.join(SOUNDS_DIR, "generating_bg.wav")
 
 # TTS output folder
 TTS_OUTPUT_DIR = os.path.join(PROJECT_ROOT, "tts_cache")
+# Maps a hash of synthesized text to the wav already generated for it
+TTS_TEXT_CACHE_FILE = os.path.join(TTS_OUTPUT_DIR, "text_cache.json")
 
 # TTS pre-generated voice over paths
 TTS_DEFAULT_DIR = os.path.join(PROJECT_ROOT, "tts_default")
@@ -158,7 +160,8 @@ REQUIRED_AUDIO_ASSETS = [
 # -----------------------------------------
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-TTS_WORKER_COUNT = 2
+TTS_WORKER_COUNT = 4 # Concurrent TTS requests; keep within the model's per-minute quota
+TTS_REQUESTS_PER_MINUTE = 60 # Token-bucket admission rate for TTS requests; match the project's quota
 TTS_SAMPLE_RATE = 24000
 INITIAL_QUESTION_COUNT = 3
 BUTTON_PIN = 17
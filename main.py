@@ -4,6 +4,7 @@ import sys
 from logger import log
 from audio import audio
 from stt_manager import stt
+from tts_manager import tts
 from llm_evaluator import llm
 from button_handler import ButtonHandler, IS_AIY
 from state_machine import game
@@ -30,6 +31,7 @@ def main():
 
     # --- Network and Web UI Setup ---
     web_app.start_in_thread()
+    net.start_status_refresher()
     if not net.is_connected():
         log.info("No WiFi connection. Starting setup hotspot.")
         net.start_hotspot()
@@ -38,6 +40,10 @@ def main():
         log.info("Shutdown requested while in hotspot mode.")
         sys.exit(0)
 
+    # Open the cloud connections now, so the first recognition and synthesis calls don't pay for it
+    stt.prewarm()
+    tts.prewarm()
+
     # --- Pre-flight checks ---
     if not IS_AIY:
         log.error("This application requires the AIY board library to run.")
@@ -83,6 +89,7 @@ def main():
             audio.stop_bg()
             audio.shutdown()
             stt.shutdown()
+            tts.shutdown()
             log.info("Application exited gracefully.")
             sys.exit(0)
 
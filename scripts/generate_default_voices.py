@@ -46,14 +46,13 @@ def main():
     success_count = 0
     fail_count = 0
 
-    # Create a list of jobs for the TTS manager
-    jobs = []
-    for filepath, text in DEFAULT_VOICE_LINES.items():
-        jobs.append((text, filepath))
+    # Create the job lists (texts and their output paths) for the TTS manager
+    paths = list(DEFAULT_VOICE_LINES.keys())
+    texts = list(DEFAULT_VOICE_LINES.values())
 
     # Use the TTS manager's internal generation jobs method.
     # The manager will handle its own rate limiting internally.
-    tts._run_generation_jobs(jobs)
+    tts._run_generation_jobs(texts, paths)
 
     # Verify which files were created
     for filepath, text in DEFAULT_VOICE_LINES.items():
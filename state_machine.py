@@ -168,7 +168,7 @@ class StateMachine:
 
     def _update_ui_timer(self):
         """Emits a timer update to the UI."""
-        time_left = max(0, int(self.time_remaining_in_round - (time.time() - self.timer_start_time)))
+        time_left = max(0, int(self.time_remaining_in_round - (time.monotonic() - self.timer_start_time)))
         emit_game_update({'time_left': time_left})
 
     def _start_or_resume_timer(self):
@@ -177,9 +177,9 @@ class StateMachine:
             return
             
         audio.play_bg(SOUND_SUSPENSE_TIMER, volume=0.3)
-        self.timer_start_time = time.time()
+        self.timer_start_time = time.monotonic()
         
-        self.game_timer = Timer(self.time_remaining_in_round, self._on_timer_expired)
+        self.game_timer = Timer(self.time_remaining_in_round, self._on_timer_expired, blocking=True)
         self.game_timer.start()
         
         self.ui_timer = Timer(1, self._update_ui_timer, recurring=True)
@@ -187,10 +187,10 @@ class StateMachine:
         
         warning_time = self.time_remaining_in_round - 5
         if warning_time > 0:
-            self.warning_timer = Timer(warning_time, lambda: audio.play(SOUND_TIME_WARNING))
+            self.warning_timer = Timer(warning_time, lambda: audio.play(SOUND_TIME_WARNING), blocking=True)
             self.warning_timer.start()
             if self.button_handler:
-                self.led_flash_timer = Timer(warning_time, lambda: self.button_handler.blink_led(10, 0.25))
+                self.led_flash_timer = Timer(warning_time, lambda: self.button_handler.blink_led(10, 0.25), blocking=True)
                 self.led_flash_timer.start()
 
     def _pause_timer(self):
@@ -200,7 +200,7 @@ class StateMachine:
             if self.warning_timer: self.warning_timer.stop()
             if self.ui_timer: self.ui_timer.stop()
             if self.led_flash_timer: self.led_flash_timer.stop()
-            elapsed_time = time.time() - self.timer_start_time
+            elapsed_time = time.monotonic() - self.timer_start_time
             self.time_remaining_in_round -= elapsed_time
             self._update_ui_timer() # Send final timer value
             log.debug(f"Timer paused. Time remaining: {self.time_remaining_in_round:.2f}s")
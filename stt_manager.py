@@ -8,12 +8,12 @@ This approach avoids the deprecated aiy.voice library wrappers.
 
 import sounddevice as sd
 import numpy as np
+import grpc
 from google.cloud import speech
 from logger import log
 import threading
 import queue
 import wave
-import time
 from audio import audio
 
 # Audio recording parameters
@@ -21,8 +21,9 @@ SAMPLERATE = 16000
 CHANNELS = 1
 DTYPE = 'int16'
 WAV_OUTPUT_FILENAME = "last_recording.wav"
-SILENCE_THRESHOLD = 500  # RMS threshold for considering audio as silence
-BLOCK_SIZE = 8000 # Block size for audio processing
+BLOCK_SIZE = 3200 # Block size for audio processing (200 ms, a standard streaming chunk)
+MAX_RECORDING_SEC = 30 # Upper bound on how much audio is kept in the debug recording
+RING_SLOTS = 16 # Preallocated audio blocks between the callback and the consumer (power of two)
 
 class STTManager:
     """
@@ -37,90 +38,170 @@ class STTManager:
                 language_code="ru-RU",
             ),
             interim_results=True, # Enable interim results for faster feedback
-            single_utterance=False, # Allow multiple utterances
+            single_utterance=True, # Let the server detect the end of speech
         )
-        self._buffer = queue.Queue()
+        # Single-producer/single-consumer ring: the callback only advances _head,
+        # the generator only advances _tail, so neither side needs a lock.
+        self._slots = np.zeros((RING_SLOTS, BLOCK_SIZE), dtype=np.int16)
+        self._slot_frames = [0] * RING_SLOTS
+        self._head = 0
+        self._tail = 0
+        self._buffer_event = threading.Event() # Signals the consumer that new audio has arrived
         self._stop_event = threading.Event()
+        self._recording = threading.Event() # Gates the callback; the stream itself stays open
         self._stream = None # To hold the sounddevice stream object
+        self._ensure_stream()
         log.info("Speech-to-Text manager initialized (using sounddevice).")
 
+    def prewarm(self):
+        """
+        Starts connecting the gRPC channel in the background (DNS + TLS), so
+        the first streaming_recognize call doesn't pay for it. Does not block.
+        Called once by main() at startup rather than on import.
+        """
+        try:
+            grpc.channel_ready_future(self.client.transport.grpc_channel)
+        except Exception as e:
+            log.debug(f"Could not prewarm the Speech-to-Text channel: {e}")
+
+    def _ensure_stream(self):
+        """
+        Opens and starts the input stream once and keeps it running, so that
+        each recognition turn doesn't pay the PortAudio device open cost.
+        """
+        if self._stream and self._stream.active:
+            return
+        try:
+            self._stream = sd.InputStream(samplerate=SAMPLERATE, channels=CHANNELS, dtype=DTYPE,
+                                blocksize=BLOCK_SIZE, callback=self._audio_callback)
+            self._stream.start()
+        except Exception as e:
+            log.error(f"Failed to open the sounddevice input stream: {e}")
+            self._stream = None
+
     def _audio_callback(self, indata, frames, time, status):
         """This is called by the sounddevice stream for each audio block."""
+        if not self._recording.is_set():
+            return
         if status:
             log.warn(f"Sounddevice status: {status}")
-        self._buffer.put(bytes(indata))
+        head = self._head
+        slot = head & (RING_SLOTS - 1)
+        np.copyto(self._slots[slot, :frames], indata.reshape(-1))
+        self._slot_frames[slot] = frames
+        self._head = head + 1
+        self._buffer_event.set()
 
-    def _write_to_wav(self, audio_chunks):
-        """Saves the collected audio chunks to a .wav file."""
+    def _open_wav(self):
+        """Opens the .wav file that the recording is streamed into as it is captured."""
         log.info(f"Saving recording to {WAV_OUTPUT_FILENAME}...")
         try:
-            with wave.open(WAV_OUTPUT_FILENAME, 'wb') as wf:
-                wf.setnchannels(CHANNELS)
-                wf.setsampwidth(2)
-                wf.setframerate(SAMPLERATE)
-                wf.writeframes(b''.join(audio_chunks))
+            wf = wave.open(WAV_OUTPUT_FILENAME, 'wb')
+            wf.setnchannels(CHANNELS)
+            wf.setsampwidth(2)
+            wf.setframerate(SAMPLERATE)
+            return wf
+        except Exception as e:
+            log.error(f"Failed to open .wav file: {e}")
+            return None
+
+    def _close_wav(self, wf):
+        """Closes the recording file, which also patches the RIFF header sizes."""
+        if wf is None:
+            return
+        try:
+            wf.close()
             log.info("Recording saved successfully.")
         except Exception as e:
             log.error(f"Failed to save .wav file: {e}")
 
-    def recognize_speech(self, hint_text="Speak now...", timeout_sec=15, silence_duration_sec=0.8):
+    def _writer_loop(self, wf, chunks):
+        """Drains recorded blocks into the .wav file until the None sentinel arrives."""
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is None:
+                    break
+                # writeframes() would seek back and patch the header after every
+                # block; the raw variant defers that to a single patch on close.
+                wf.writeframesraw(chunk)
+        except Exception as e:
+            log.error(f"Failed to write .wav frames: {e}")
+        finally:
+            self._close_wav(wf)
+
+    def recognize_speech(self, hint_text="Speak now...", timeout_sec=15):
         """
         Listens for speech and returns the transcribed text.
-        Stops listening after a period of silence.
+        Stops listening when the server reports the end of the utterance.
         """
         log.info(f"Listening for speech... ({hint_text})")
-        self._buffer = queue.Queue()
+        self._tail = self._head # Discard any blocks left over from a previous session
+        self._buffer_event.clear()
         self._stop_event.clear()
+        self._ensure_stream()
         
-        recorded_chunks = []
-        last_sound_time = time.time()
+        wf = self._open_wav()
+        wav_chunks = queue.Queue()
+        writer = None
+        if wf:
+            writer = threading.Thread(target=self._writer_loop, args=(wf, wav_chunks), daemon=True)
+            writer.start()
+        recorded_frames = 0
         full_transcript = ""
 
         def audio_generator():
-            nonlocal last_sound_time
+            nonlocal recorded_frames
             while not self._stop_event.is_set():
-                chunk = self._buffer.get()
-                if chunk is None:
-                    break
-                
-                recorded_chunks.append(chunk)
-                
-                rms = np.sqrt(np.mean(np.frombuffer(chunk, dtype=np.int16).astype(np.float32)**2))
-                if rms > SILENCE_THRESHOLD:
-                    last_sound_time = time.time()
-                
-                if time.time() - last_sound_time > silence_duration_sec:
-                    log.info(f"Silence detected for over {silence_duration_sec} seconds. Stopping recording.")
-                    self._stop_event.set()
+                head = self._head
+                if head == self._tail:
+                    self._buffer_event.wait(0.05)
+                    self._buffer_event.clear()
+                    continue
+                if head - self._tail >= RING_SLOTS:
+                    # The callback never blocks, so when we fall behind the oldest blocks are dropped
+                    log.warn(f"STT consumer fell behind, dropping {head - self._tail - RING_SLOTS + 1} audio block(s).")
+                    self._tail = head - RING_SLOTS + 1
+                slot = self._tail & (RING_SLOTS - 1)
+                samples = self._slots[slot, :self._slot_frames[slot]]
+                # The only bytes copy, made on this thread rather than the audio
+                # callback; the request and the wav writer share it.
+                chunk = samples.tobytes()
+                self._tail += 1
+
+                if writer and recorded_frames < MAX_RECORDING_SEC * SAMPLERATE:
+                    wav_chunks.put(chunk)
+                    recorded_frames += len(samples)
 
                 yield speech.StreamingRecognizeRequest(audio_content=chunk)
 
         try:
             audio.mute_all()
             log.info("Recording started...")
-            self._stream = sd.InputStream(samplerate=SAMPLERATE, channels=CHANNELS, dtype=DTYPE,
-                                blocksize=BLOCK_SIZE, callback=self._audio_callback)
-            with self._stream:
-                requests = audio_generator()
-                responses = self.client.streaming_recognize(
-                    config=self.streaming_config,
-                    requests=requests,
-                    timeout=timeout_sec
-                )
-
-                for response in responses:
-                    if not response.results:
-                        continue
-                    
-                    result = response.results[0]
-                    if not result.alternatives:
-                        continue
-
-                    transcript = result.alternatives[0].transcript
-                    if result.is_final:
-                        full_transcript += transcript + " "
-                        log.debug(f"Intermediate transcript: '{full_transcript}'")
-            
+            self._recording.set()
+            requests = audio_generator()
+            responses = self.client.streaming_recognize(
+                config=self.streaming_config,
+                requests=requests,
+                timeout=timeout_sec
+            )
+
+            for response in responses:
+                if response.speech_event_type == speech.StreamingRecognizeResponse.SpeechEventType.END_OF_SINGLE_UTTERANCE:
+                    log.info("End of utterance detected. Stopping recording.")
+                    self._stop_event.set()
+                if not response.results:
+                    continue
+                
+                result = response.results[0]
+                if not result.alternatives:
+                    continue
+
+                transcript = result.alternatives[0].transcript
+                if result.is_final:
+                    full_transcript += transcript + " "
+                    log.debug(f"Intermediate transcript: '{full_transcript}'")
+
             log.info(f"Final speech recognized: '{full_transcript.strip()}'")
             return full_transcript.strip()
 
@@ -130,10 +211,13 @@ class STTManager:
                 log.info("Recognition timed out.")
             return None
         finally:
+            self._recording.clear()
             audio.unmute_all()
             self._stop_event.set()
-            self._buffer.put(None) # Ensure the generator loop terminates
-            self._write_to_wav(recorded_chunks)
+            self._buffer_event.set() # Wake the generator so it sees the stop event
+            if writer:
+                wav_chunks.put(None) # Let the writer flush and close the file
+                writer.join(timeout=1.0)
             log.info("Recording stopped.")
 
     def shutdown(self):
@@ -0,0 +1,67 @@
+"""
+test_network_manager.py
+-----------------------
+Tests for the nmcli fallback parsers in web.network_manager.
+"""
+
+import unittest
+from unittest.mock import patch
+import os
+import sys
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from web import network_manager as net
+
+def _nmcli(connectivity="full", device="100 (connected)\nHomeNet"):
+    """Returns a _run_command stand-in answering the queries the fallback issues."""
+    def run(command, **kwargs):
+        if command[1:] == ['networking', 'connectivity']:
+            return connectivity
+        if command[1:3] == ['-g', 'GENERAL.STATE,GENERAL.CONNECTION']:
+            return device
+        if command[1:3] == ['-g', 'GENERAL.CONNECTION']:
+            return device.partition('\n')[2] or ""
+        raise AssertionError(f"Unexpected command: {command}")
+    return run
+
+@patch.object(net, 'HAS_DBUS', False)
+@patch.object(net, '_HOTSPOT_UUID', None)
+class NmcliFallbackTests(unittest.TestCase):
+
+    def setUp(self):
+        net._invalidate_status_cache()
+
+    def test_wifi_client_is_connected(self):
+        with patch.object(net, '_run_command', _nmcli()):
+            self.assertTrue(net._query_connected())
+            self.assertTrue(net.is_connected())
+            self.assertEqual(net.get_current_ssid(), "HomeNet")
+
+    def test_hotspot_is_not_connected(self):
+        for name in (net.HOTSPOT_CONNECTION_ID, 'Hotspot'):
+            with patch.object(net, '_run_command', _nmcli(device=f"100 (connected)\n{name}")):
+                self.assertFalse(net._query_connected())
+
+    def test_limited_connectivity_is_not_connected(self):
+        with patch.object(net, '_run_command', _nmcli(connectivity="limited")):
+            self.assertFalse(net._query_connected())
+
+    def test_disconnected_device(self):
+        with patch.object(net, '_run_command', _nmcli(device="30 (disconnected)\n")):
+            self.assertFalse(net._query_connected())
+            self.assertIsNone(net._query_current_ssid())
+
+    def test_escaped_colon_in_connection_name(self):
+        with patch.object(net, '_run_command', _nmcli(device="100 (connected)\nCafe\\:Guest")):
+            self.assertTrue(net._query_connected())
+            self.assertEqual(net._query_current_ssid(), "Cafe:Guest")
+
+    def test_nmcli_missing(self):
+        with patch.object(net, '_run_command', lambda command, **kwargs: None):
+            self.assertFalse(net._query_connected())
+            self.assertIsNone(net._query_current_ssid())
+
+if __name__ == '__main__':
+    unittest.main()
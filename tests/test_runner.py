@@ -14,10 +14,14 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.insert(0, project_root)
 
 from state_machine import StateMachine
+import config
 from config import *
 
 SCENARIOS_FILE = os.path.join(os.path.dirname(__file__), 'test_scenarios.json')
 
+# Reverse lookup from an audio file path to its config constant name
+_PATH_TO_KEY = {v: k for k, v in vars(config).items() if isinstance(v, str) and (v.endswith('.wav') or v.endswith('.mp3'))}
+
 STATE_MAP = {
     "STATE_WAITING_TOPIC": STATE_WAITING_TOPIC,
     "STATE_WAITING_TOPIC_INPUT": STATE_WAITING_TOPIC_INPUT,
@@ -58,14 +62,13 @@ class DataDrivenStateMachineTests(unittest.TestCase):
                 sm = StateMachine()
                 
                 audio_play_calls = []
-                path_to_key = {v: k for k, v in globals().items() if isinstance(v, str) and ('.wav' in v or '.mp3' in v)}
-                
+
                 def audio_side_effect(filepath, **kwargs):
-                    key = path_to_key.get(filepath, f"DYNAMIC_AUDIO:{os.path.basename(filepath)}")
+                    key = _PATH_TO_KEY.get(filepath, f"DYNAMIC_AUDIO:{os.path.basename(filepath)}")
                     audio_play_calls.append(key)
 
                 MockAudio.play.side_effect = audio_side_effect
-                MockAudio.play_bg.side_effect = lambda path, **kwargs: audio_play_calls.append(path_to_key.get(path, path))
+                MockAudio.play_bg.side_effect = lambda path, **kwargs: audio_play_calls.append(_PATH_TO_KEY.get(path, path))
                 MockAudio.stop_bg.side_effect = lambda: audio_play_calls.append("STOP_BG_MUSIC")
 
                 MockTts.get_host_intro_audio.side_effect = lambda q_id: f"/mock/intro_{q_id}.wav"
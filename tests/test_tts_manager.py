@@ -0,0 +1,51 @@
+"""
+test_tts_manager.py
+-------------------
+Tests for parsing server retry hints out of google-genai API errors.
+"""
+
+import unittest
+import os
+import sys
+
+import httpx
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from google.genai import errors
+from tts_manager import _retry_after
+
+def _api_error(code, details=None, headers=None):
+    body = {'error': {'code': code, 'message': 'Quota exceeded.', 'status': 'RESOURCE_EXHAUSTED', 'details': details or []}}
+    return errors.APIError(code, body, httpx.Response(code, headers=headers or {}))
+
+class RetryAfterTests(unittest.TestCase):
+
+    def test_retry_info_delay_from_error_details(self):
+        error = _api_error(429, details=[
+            {'@type': 'type.googleapis.com/google.rpc.QuotaFailure', 'violations': []},
+            {'@type': 'type.googleapis.com/google.rpc.RetryInfo', 'retryDelay': '30s'},
+        ])
+        self.assertEqual(_retry_after(error), 30.0)
+
+    def test_fractional_retry_info_delay(self):
+        error = _api_error(429, details=[{'@type': 'type.googleapis.com/google.rpc.RetryInfo', 'retryDelay': '1.5s'}])
+        self.assertEqual(_retry_after(error), 1.5)
+
+    def test_retry_after_header(self):
+        error = _api_error(503, headers={'Retry-After': '7'})
+        self.assertEqual(_retry_after(error), 7.0)
+
+    def test_unparseable_retry_after_header(self):
+        error = _api_error(503, headers={'Retry-After': 'Wed, 21 Oct 2026 07:28:00 GMT'})
+        self.assertIsNone(_retry_after(error))
+
+    def test_no_hint(self):
+        self.assertIsNone(_retry_after(_api_error(500)))
+
+    def test_non_api_error(self):
+        self.assertIsNone(_retry_after(ValueError("Synthesize speech returned None")))
+
+if __name__ == '__main__':
+    unittest.main()
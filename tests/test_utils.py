@@ -0,0 +1,60 @@
+"""
+test_utils.py
+-------------
+Tests for the shared-scheduler Timer.
+"""
+
+import unittest
+import threading
+import time
+import os
+import sys
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from utils import Timer, TIMER_CALLBACK_WORKERS
+
+class TimerTests(unittest.TestCase):
+
+    def test_fires_once(self):
+        fired = threading.Event()
+        timer = Timer(0.05, fired.set)
+        timer.start()
+        self.assertTrue(fired.wait(1))
+        time.sleep(0.05)
+        self.assertFalse(timer.is_running())
+
+    def test_stop_cancels(self):
+        fired = threading.Event()
+        timer = Timer(0.1, fired.set)
+        timer.start()
+        timer.stop()
+        self.assertFalse(fired.wait(0.3))
+
+    def test_recurring(self):
+        ticks = []
+        timer = Timer(0.02, lambda: ticks.append(1), recurring=True)
+        timer.start()
+        time.sleep(0.15)
+        timer.stop()
+        self.assertGreaterEqual(len(ticks), 3)
+
+    def test_blocking_callbacks_do_not_delay_other_timers(self):
+        release = threading.Event()
+        blockers = [Timer(0.01, lambda: release.wait(2), blocking=True) for _ in range(TIMER_CALLBACK_WORKERS + 1)]
+        for blocker in blockers:
+            blocker.start()
+        time.sleep(0.05) # Let every blocking callback start and park
+        fired_at = []
+        started = time.monotonic()
+        tick = threading.Event()
+        Timer(0.05, lambda: (fired_at.append(time.monotonic()), tick.set())).start()
+        try:
+            self.assertTrue(tick.wait(1))
+            self.assertLess(fired_at[0] - started, 0.3)
+        finally:
+            release.set()
+
+if __name__ == '__main__':
+    unittest.main()
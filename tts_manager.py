@@ -7,19 +7,26 @@ retry mechanism to handle API rate limits.
 """
 
 import os
+import json
+import hashlib
 import shutil
-import wave
+import struct
+import tempfile
 import time
 import random
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from logger import log
 from config import (
     TTS_OUTPUT_DIR, 
+    TTS_TEXT_CACHE_FILE,
     INITIAL_QUESTION_COUNT, 
     SCORE_ANNOUNCEMENT_TEMPLATES, 
     TTS_NO_TEAM,
     OVERWRITE_EXISTING_TTS,
     FORCE_SYNC_TTS_GENERATION,
+    TTS_WORKER_COUNT,
+    TTS_REQUESTS_PER_MINUTE,
     GCP_PROJECT_ID,
     GCP_LOCATION
 )
@@ -27,38 +34,323 @@ from config import (
 try:
     from google import genai
     from google.genai import types
-    from google.api_core import exceptions
+    from google.genai import errors
+    import httpx # Transport used by google-genai; its timeouts signal an overloaded backend
 except ImportError:
     log.error("The 'google-generativeai' library is not installed. Please run 'pip install google-generativeai'.")
     exit(1)
 
+# HTTP status codes worth retrying; any other 4xx (auth, bad request) fails immediately
+RETRYABLE_STATUS_CODES = (429, 500, 503, 504)
+THROTTLE_STATUS_CODES = (429, 503) # Responses that halve the AIMD concurrency limit
+MAX_TOTAL_RETRY_DELAY = 60 # Seconds of backoff allowed per file before giving up
+
+# Dispatch order for initial generation: lines needed earliest in a round go first
+JOB_PRIORITY = {"host_intro": 0, "question": 1, "hint": 2, "answer": 3, "fun_fact": 4}
+
+# AIMD concurrency control for synthesis RPCs
+AIMD_INITIAL_CONCURRENCY = 2
+AIMD_INCREASE = 0.5 # Added to the limit after a healthy request
+AIMD_DECREASE = 0.5 # Limit multiplier after a throttle or timeout
+AIMD_TARGET_LATENCY = 8.0 # Seconds; smoothed latency above this stops growth
+AIMD_THROTTLE_COOLDOWN = 10.0 # Seconds after a throttle before growing again
+TTS_REQUEST_TIMEOUT = 60 # Seconds; bounds a single synthesis RPC, and so how long shutdown can take
+
+def _is_throttle(error):
+    """True for quota/overload responses and client timeouts, which should shrink concurrency."""
+    if isinstance(error, errors.APIError):
+        return error.code in THROTTLE_STATUS_CODES
+    return isinstance(error, httpx.TimeoutException)
+
+def _is_retryable(error):
+    """False for API client errors that will fail the same way on every attempt."""
+    if not isinstance(error, errors.APIError):
+        return True # Empty responses and transport failures
+    return error.code in RETRYABLE_STATUS_CODES or not 400 <= error.code < 500
+
+def _retry_after(error):
+    """Returns the server-suggested retry delay in seconds, or None if the error carries none."""
+    # APIError.details is the decoded error body; Vertex AI puts a google.rpc.RetryInfo
+    # entry such as {"retryDelay": "30s"} in its details list
+    body = getattr(error, 'details', None)
+    body = body.get('error') if isinstance(body, dict) else None
+    for detail in (body.get('details') or []) if isinstance(body, dict) else []:
+        if isinstance(detail, dict) and str(detail.get('@type', '')).endswith('google.rpc.RetryInfo'):
+            try:
+                return float(str(detail.get('retryDelay', '')).rstrip('s'))
+            except ValueError:
+                break
+    # APIError.response is the httpx response, which may carry a Retry-After header
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    if headers and headers.get('retry-after'):
+        try:
+            return float(headers['retry-after'])
+        except ValueError:
+            return None
+    return None
+
 class TTSManager:
     """
     Manages batch TTS generation using the Gemini API via Vertex AI.
     """
     def __init__(self):
         self.output_dir = TTS_OUTPUT_DIR
+        self._out = self.output_dir + os.sep # Prefix for building output paths with f-strings
         self.game_data = None
         self.model_id = "gemini-2.5-flash-tts"
         self.voice_name = "Achird"
+        # 44-byte RIFF header for 24 kHz mono 16-bit PCM; only the two size fields vary per file
+        self._wav_prefix = struct.pack(
+            '<4sI4s4sIHHIIHH4sI',
+            b'RIFF', 0, b'WAVE',
+            b'fmt ', 16, 1, 1, 24000, 48000, 2, 16,
+            b'data', 0
+        )
+        # Token bucket: holds up to a minute's worth of requests, refilled continuously
+        self.requests_per_minute = TTS_REQUESTS_PER_MINUTE
+        self.rate_limit_lock = threading.Lock()
+        self._tokens = float(self.requests_per_minute)
+        self._rate = self.requests_per_minute / 60.0
+        self._last_refill = time.monotonic()
+        # In-flight RPC limit, grown additively on healthy latency and halved on
+        # throttling (AIMD). Never exceeds the executor size.
+        self._concurrency_cond = threading.Condition()
+        self._concurrency = float(min(AIMD_INITIAL_CONCURRENCY, TTS_WORKER_COUNT))
+        self._in_flight = 0
+        self._latency_ewma = None
+        self._last_throttle = 0.0
+        # Shared by every batch, so background jobs don't each spin up their own threads.
+        # Mid-game regeneration gets its own pool so it never queues behind that backlog.
+        self._executor = ThreadPoolExecutor(max_workers=TTS_WORKER_COUNT, thread_name_prefix="tts")
+        self._regen_executor = ThreadPoolExecutor(max_workers=TTS_WORKER_COUNT, thread_name_prefix="tts-regen")
+        self._stopping = threading.Event() # Set by shutdown() to abandon waits and retries
+        self._regenerated = set() # Paths rewritten by regenerate_round_audio, which background jobs skip
+        self._sweep_partial_files()
+        # Filenames known to exist in output_dir, so lookups don't need a stat() call
+        self._generated_lock = threading.Lock()
+        self._generated = set()
+        self._refresh_generated()
+        # Text hash -> wav path, so identical lines are synthesized only once
+        self._text_cache_lock = threading.Lock()
+        self._text_cache = self._load_text_cache()
         
         try:
-            self.client = genai.Client(vertexai=True, project=GCP_PROJECT_ID, location=GCP_LOCATION)
+            self.client = genai.Client(
+                vertexai=True, project=GCP_PROJECT_ID, location=GCP_LOCATION,
+                http_options=types.HttpOptions(timeout=TTS_REQUEST_TIMEOUT * 1000), # milliseconds
+            )
+            # Identical for every request, so it is built once rather than per call
+            self._tts_config = types.GenerateContentConfig(
+                response_modalities=["AUDIO"],
+                speech_config=types.SpeechConfig(
+                    voice_config=types.VoiceConfig(
+                        prebuilt_voice_config=types.PrebuiltVoiceConfig(
+                            voice_name=self.voice_name,
+                        )
+                    )
+                )
+            )
             self.is_ready = True
             log.info(f"TTS Manager initialized with Vertex AI model '{self.model_id}' and voice '{self.voice_name}'.")
         except Exception as e:
             log.error(f"Failed to configure Vertex AI client. Ensure GOOGLE_APPLICATION_CREDENTIALS is set correctly: {e}")
             self.is_ready = False
 
+    def prewarm(self):
+        """Warms up the Vertex AI connection in the background. Called once by main() at startup."""
+        if self.is_ready:
+            threading.Thread(target=self._prewarm_client, daemon=True).start()
+
+    def _prewarm_client(self):
+        """
+        Issues one cheap request so DNS, TLS and the auth token are in place
+        before the first synthesis call.
+        """
+        try:
+            next(iter(self.client.models.list(config={'page_size': 1})), None)
+            log.debug("Vertex AI connection prewarmed.")
+        except Exception as e:
+            log.debug(f"Could not prewarm the Vertex AI connection: {e}")
+
     def _clear_cache(self):
-        """Atomically removes and recreates the TTS output directory."""
-        if os.path.exists(self.output_dir):
+        """
+        Empties the TTS output directory, creating it if missing. The directory
+        is flat, so entries are unlinked directly rather than walked by rmtree.
+        """
+        try:
+            entries = list(os.scandir(self.output_dir))
+        except FileNotFoundError:
+            entries = []
+            os.makedirs(self.output_dir, exist_ok=True)
+        if entries:
             log.info(f"Clearing TTS cache directory: {self.output_dir}")
+        for entry in entries:
             try:
-                shutil.rmtree(self.output_dir)
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path)
+                else:
+                    os.unlink(entry.path)
             except OSError as e:
-                log.error(f"Error removing directory {self.output_dir}: {e}")
-        os.makedirs(self.output_dir, exist_ok=True)
+                log.error(f"Error removing {entry.path}: {e}")
+        self._refresh_generated()
+        with self._text_cache_lock:
+            self._text_cache.clear()
+
+    def _sweep_partial_files(self):
+        """Deletes .tmp files left behind by a generation interrupted mid-write."""
+        if not os.path.isdir(self.output_dir):
+            return
+        for name in os.listdir(self.output_dir):
+            if name.endswith('.tmp'):
+                try:
+                    os.remove(os.path.join(self.output_dir, name))
+                except OSError as e:
+                    log.warn(f"Could not remove partial TTS file {name}: {e}")
+
+    def _load_text_cache(self):
+        """Loads the persisted text hash -> wav path map, if any."""
+        try:
+            with open(TTS_TEXT_CACHE_FILE, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _text_key(self, text):
+        """Hashes the text together with the voice, since both determine the audio."""
+        return hashlib.blake2b(f"{self.voice_name}:{text}".encode(), digest_size=16).hexdigest()
+
+    def _forget_path_locked(self, filepath):
+        """Drops entries pointing at filepath, whose audio is about to change. Caller holds the lock."""
+        for stale in [k for k, path in self._text_cache.items() if path == filepath]:
+            del self._text_cache[stale]
+
+    def _remember_text(self, key, filepath):
+        """Records a freshly generated file for its text; persisted by _save_text_cache."""
+        with self._text_cache_lock:
+            self._forget_path_locked(filepath)
+            self._text_cache[key] = filepath
+
+    def _save_text_cache(self):
+        """Writes the text hash -> wav path map via a temp file, once per batch."""
+        tmp_path = TTS_TEXT_CACHE_FILE + '.tmp'
+        with self._text_cache_lock:
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump(self._text_cache, f)
+                os.replace(tmp_path, TTS_TEXT_CACHE_FILE)
+            except OSError as e:
+                log.warn(f"Failed to persist TTS text cache: {e}")
+
+    def _save_text_cache_when_done(self, futures):
+        """Persists the text cache once every future of a background batch has finished."""
+        remaining = [len(futures)]
+        lock = threading.Lock()
+        def on_done(_):
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self._save_text_cache()
+        for future in futures:
+            future.add_done_callback(on_done)
+
+    def _reuse_cached_audio(self, key, output_filepath):
+        """
+        Links output_filepath to an existing wav generated from the same text.
+        Returns True if the file was reused, False if it still needs synthesis.
+        """
+        with self._text_cache_lock:
+            cached = self._text_cache.get(key)
+        if not cached or cached == output_filepath or not os.path.exists(cached):
+            return False
+        try:
+            if os.path.exists(output_filepath):
+                os.remove(output_filepath)
+            try:
+                os.link(cached, output_filepath)
+            except OSError:
+                shutil.copyfile(cached, output_filepath) # e.g. cross-device or no hardlink support
+        except OSError as e:
+            log.warn(f"Could not reuse {os.path.basename(cached)} for {os.path.basename(output_filepath)}: {e}")
+            return False
+        with self._text_cache_lock:
+            self._forget_path_locked(output_filepath)
+        self._mark_generated(output_filepath)
+        log.debug(f"Reused cached audio {os.path.basename(cached)} for {os.path.basename(output_filepath)}")
+        return True
+
+    def _wait_for_rate_limit(self):
+        """
+        Blocks until the token bucket admits one request, returning False if
+        shutdown begins first. The lock is only held for the O(1) refill
+        arithmetic; any waiting happens outside of it.
+        """
+        while True:
+            with self.rate_limit_lock:
+                now = time.monotonic()
+                self._tokens = min(self.requests_per_minute, self._tokens + (now - self._last_refill) * self._rate)
+                self._last_refill = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait_time = (1 - self._tokens) / self._rate
+            if self._stopping.wait(wait_time):
+                return False
+
+    def _sync_tokens_from_response(self, response):
+        """
+        Clamps the token bucket to the remaining request budget reported by the
+        server, when the response exposes rate-limit headers.
+        """
+        try:
+            http_response = getattr(response, 'sdk_http_response', None) or response._response
+            remaining = http_response.headers.get('x-ratelimit-remaining-requests')
+        except AttributeError:
+            return # Header exposure depends on the SDK version
+        if remaining is None:
+            return
+        try:
+            remaining = int(remaining)
+        except ValueError:
+            return
+        with self.rate_limit_lock:
+            self._tokens = min(self._tokens, remaining)
+
+    def _pause_rate_limit(self, retry_delay):
+        """Empties the token bucket after a quota error so no thread is admitted before retry_delay."""
+        with self.rate_limit_lock:
+            self._tokens = 0
+            self._last_refill = time.monotonic() + (retry_delay or 0)
+
+    def _acquire_rpc_slot(self):
+        """
+        Blocks until the current AIMD limit allows another in-flight request.
+        Returns False without taking a slot if shutdown begins first.
+        """
+        with self._concurrency_cond:
+            while self._in_flight >= int(self._concurrency):
+                if self._stopping.is_set():
+                    return False
+                self._concurrency_cond.wait()
+            self._in_flight += 1
+            return True
+
+    def _release_rpc_slot(self, latency=None, throttled=False):
+        """
+        Frees an in-flight slot and adjusts the limit: multiplicative decrease
+        on throttling, additive increase while latency stays under target.
+        """
+        with self._concurrency_cond:
+            self._in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                self._last_throttle = now
+                self._concurrency = max(1.0, self._concurrency * AIMD_DECREASE)
+            elif latency is not None:
+                self._latency_ewma = latency if self._latency_ewma is None else 0.8 * self._latency_ewma + 0.2 * latency
+                if self._latency_ewma < AIMD_TARGET_LATENCY and now - self._last_throttle > AIMD_THROTTLE_COOLDOWN:
+                    self._concurrency = min(TTS_WORKER_COUNT, self._concurrency + AIMD_INCREASE)
+            self._concurrency_cond.notify_all()
 
     def _synthesize_speech(self, text):
         """
@@ -67,69 +359,179 @@ class TTSManager:
         if not self.is_ready:
             return None
         try:
-            config = types.GenerateContentConfig(
-                response_modalities=["AUDIO"],
-                speech_config=types.SpeechConfig(
-                    voice_config=types.VoiceConfig(
-                        prebuilt_voice_config=types.PrebuiltVoiceConfig(
-                            voice_name=self.voice_name,
-                        )
-                    )
+            if not self._wait_for_rate_limit() or not self._acquire_rpc_slot():
+                return None # Shutting down
+            started = time.monotonic()
+            try:
+                response = self.client.models.generate_content(
+                    model=self.model_id,
+                    contents=text,
+                    config=self._tts_config,
                 )
-            )
-            response = self.client.models.generate_content(
-                model=self.model_id,
-                contents=text,
-                config=config,
-            )
+            except Exception as e:
+                self._release_rpc_slot(throttled=_is_throttle(e))
+                raise
+            self._release_rpc_slot(latency=time.monotonic() - started)
+            self._sync_tokens_from_response(response)
             if response and response.candidates and response.candidates[0].content.parts:
                 return response.candidates[0].content.parts[0].inline_data.data
             else:
                 log.error(f"Received an empty or invalid response from Gemini API for text: '{text}'")
                 return None
+        except errors.APIError as e:
+            if e.code == 429:
+                self._pause_rate_limit(_retry_after(e)) # Quota exhausted: hold every worker off
+            raise # Let the caller decide whether the API error is worth a retry
         except Exception as e:
             log.error(f"An unexpected error occurred during TTS synthesis for '{text}': {e}")
             return None
 
+    def _wav_header(self, nbytes):
+        """Returns the RIFF header for nbytes of PCM, patched from the precomputed prefix."""
+        header = bytearray(self._wav_prefix)
+        struct.pack_into('<I', header, 4, 36 + nbytes)
+        struct.pack_into('<I', header, 40, nbytes)
+        return header
+
+    def _refresh_generated(self):
+        """Resyncs the set of known files with the contents of output_dir."""
+        present = set(os.listdir(self.output_dir)) if os.path.isdir(self.output_dir) else set()
+        with self._generated_lock:
+            self._generated = present
+
+    def _write_wav(self, fd, filepath, audio_bytes):
+        """Writes header and PCM to fd with a single writev() call, without joining them first."""
+        header = self._wav_header(len(audio_bytes))
+        try:
+            os.fchmod(fd, 0o644) # mkstemp creates files readable by the owner only
+            written = os.writev(fd, [header, audio_bytes])
+        finally:
+            os.close(fd)
+        if written != len(header) + len(audio_bytes):
+            raise OSError(f"Short write to {os.path.basename(filepath)}: {written} bytes")
+
+    def _mark_generated(self, filepath):
+        """Records a file written into output_dir so _get_audio_path can find it."""
+        if os.path.dirname(filepath) == self.output_dir:
+            with self._generated_lock:
+                self._generated.add(os.path.basename(filepath))
+
     def _generate_speech_file(self, text, output_filepath):
         """
-        Generates a .wav file from the given text, retrying up to 10 times on any failure.
+        Generates a .wav file from the given text, retrying up to 10 times on
+        transient failures. Waits the server's suggested delay when there is one,
+        otherwise uses exponential backoff with full jitter, and gives up once
+        MAX_TOTAL_RETRY_DELAY seconds of backoff have been spent.
         """
         if not OVERWRITE_EXISTING_TTS and os.path.exists(output_filepath):
             log.debug(f"Skipping existing TTS file: {os.path.basename(output_filepath)}")
+            self._mark_generated(output_filepath)
+            return
+
+        key = self._text_key(text)
+        if self._reuse_cached_audio(key, output_filepath):
             return
 
         max_retries = 10
+        total_wait = 0
         for attempt in range(max_retries):
+            if self._stopping.is_set():
+                return
             log.debug(f"Generating TTS for: {os.path.basename(output_filepath)} (Attempt {attempt + 1}/{max_retries})")
             try:
                 audio_bytes = self._synthesize_speech(text)
                 if audio_bytes:
-                    with wave.open(output_filepath, 'wb') as wf:
-                        wf.setnchannels(1)
-                        wf.setsampwidth(2)
-                        wf.setframerate(24000)
-                        wf.writeframes(audio_bytes)
+                    # Write to a temp file and rename, so a crash never leaves a truncated .wav behind.
+                    # The name is unique per write, as regeneration may race a background job for the path.
+                    fd, tmp_filepath = tempfile.mkstemp(dir=os.path.dirname(output_filepath), suffix='.tmp')
+                    try:
+                        self._write_wav(fd, tmp_filepath, audio_bytes)
+                        os.replace(tmp_filepath, output_filepath)
+                    except OSError:
+                        try:
+                            os.remove(tmp_filepath)
+                        except OSError:
+                            pass
+                        raise
+                    self._mark_generated(output_filepath)
+                    self._remember_text(key, output_filepath)
                     log.debug(f"Successfully generated {os.path.basename(output_filepath)}")
                     return # Success, exit the retry loop
                 else:
                     raise ValueError("Synthesize speech returned None")
             except Exception as e:
+                if not _is_retryable(e):
+                    log.error(f"Non-retryable error for {os.path.basename(output_filepath)}: {e}. Skipping this file.")
+                    return
                 log.warn(f"Generation failed for {os.path.basename(output_filepath)} on attempt {attempt + 1}. Reason: {e}")
                 if attempt < max_retries - 1:
-                    wait_time = 6
-                    log.info(f"Retrying in {wait_time} seconds...")
-                    time.sleep(wait_time)
+                    wait_time = _retry_after(e)
+                    if wait_time is None:
+                        wait_time = random.uniform(0, min(30.0, 1.0 * (2 ** attempt)))
+                    if total_wait + wait_time > MAX_TOTAL_RETRY_DELAY:
+                        log.error(f"Retry budget of {MAX_TOTAL_RETRY_DELAY}s exhausted for {os.path.basename(output_filepath)}. Skipping this file.")
+                        return
+                    total_wait += wait_time
+                    log.info(f"Retrying in {wait_time:.1f} seconds...")
+                    if self._stopping.wait(wait_time):
+                        return
                 else:
                     log.error(f"All {max_retries} retry attempts failed for {os.path.basename(output_filepath)}. Skipping this file.")
 
-    def _run_generation_jobs(self, jobs):
+    def _run_generation_jobs(self, texts, paths, executor=None):
         """
-        Processes a list of TTS jobs sequentially.
+        Processes TTS jobs, given as parallel lists of texts and output paths, on
+        a pool of TTS_WORKER_COUNT threads (the shared one unless another is
+        given). Each job is a network-bound RPC, so running them concurrently
+        overlaps the round trips. Blocks until every job has finished.
         """
-        if not jobs: return
-        for text, filepath in jobs:
-            self._generate_speech_file(text, filepath)
+        texts, paths = self._filter_existing(texts, paths)
+        if not texts: return
+        groups = self._group_by_text(texts, paths)
+        list((executor or self._executor).map(self._generate_speech_group, groups.keys(), groups.values()))
+        self._save_text_cache()
+
+    def _group_by_text(self, texts, paths):
+        """Maps each distinct text to all of its output paths, keeping first-seen order."""
+        groups = {}
+        for text, path in zip(texts, paths):
+            groups.setdefault(text, []).append(path)
+        if len(groups) < len(texts):
+            log.info(f"{len(texts) - len(groups)} duplicate TTS texts will reuse already synthesized audio.")
+        return groups
+
+    def _generate_speech_group(self, text, paths, background=False):
+        """
+        Generates the first path of a group; the rest then hit the content-hash
+        cache and are linked to it instead of being synthesized again. Background
+        jobs leave alone paths that a regeneration has already produced.
+        """
+        for path in paths:
+            if background and path in self._regenerated:
+                log.debug(f"Skipping regenerated TTS file: {os.path.basename(path)}")
+                continue
+            self._generate_speech_file(text, path)
+
+    def _filter_existing(self, texts, paths):
+        """
+        When existing files are kept, drops jobs whose output is already on disk
+        before they are queued, using one listdir per output directory.
+        """
+        if OVERWRITE_EXISTING_TTS or not texts:
+            return texts, paths
+        listings = {}
+        keep_texts, keep_paths = [], []
+        for text, path in zip(texts, paths):
+            directory, name = os.path.split(path)
+            if directory not in listings:
+                listings[directory] = set(os.listdir(directory)) if os.path.isdir(directory) else set()
+            if name in listings[directory]:
+                self._mark_generated(path)
+            else:
+                keep_texts.append(text)
+                keep_paths.append(path)
+        log.info(f"{len(keep_texts)} of {len(texts)} TTS files need to be generated.")
+        return keep_texts, keep_paths
 
     def generate_sentence_async(self, text, filename):
         """
@@ -137,22 +539,28 @@ class TTSManager:
         keeps the same interface for compatibility.
         """
         if not self.is_ready: return None, None
-        filepath = os.path.join(self.output_dir, filename)
+        filepath = f"{self._out}{filename}"
         log.info(f"Starting generation for '{filename}'...")
         self._generate_speech_file(text, filepath)
         return filepath, None # Return None for the thread object
 
-    def _get_jobs_for_round(self, round_data):
+    def _get_jobs_for_round(self, round_data, texts, paths, priorities=None):
+        """
+        Appends the round's texts and output paths to the given job lists, and
+        each job's JOB_PRIORITY to priorities when one is passed.
+        """
         q_id = round_data["id"]
-        jobs = [
-            (round_data["host_intro"], os.path.join(self.output_dir, f"{q_id}_host_intro.wav")),
-            (round_data["question"], os.path.join(self.output_dir, f"{q_id}_question.wav")),
-            (round_data["answer"], os.path.join(self.output_dir, f"{q_id}_answer.wav")),
-            (round_data["fun_fact"], os.path.join(self.output_dir, f"{q_id}_fun_fact.wav"))
-        ]
+        out = self._out
+        texts.append(round_data["host_intro"]); paths.append(f"{out}{q_id}_host_intro.wav")
+        texts.append(round_data["question"]); paths.append(f"{out}{q_id}_question.wav")
+        texts.append(round_data["answer"]); paths.append(f"{out}{q_id}_answer.wav")
+        texts.append(round_data["fun_fact"]); paths.append(f"{out}{q_id}_fun_fact.wav")
         for j, hint in enumerate(round_data["hints"]):
-            jobs.append((hint, os.path.join(self.output_dir, f"{q_id}_hint_{j+1}.wav")))
-        return jobs
+            texts.append(hint)
+            paths.append(f"{out}{q_id}_hint_{j+1}.wav")
+        if priorities is not None:
+            priorities.extend((JOB_PRIORITY["host_intro"], JOB_PRIORITY["question"], JOB_PRIORITY["answer"], JOB_PRIORITY["fun_fact"]))
+            priorities.extend([JOB_PRIORITY["hint"]] * len(round_data["hints"]))
 
     def _generate_no_team_announcement(self, game_data):
         template = SCORE_ANNOUNCEMENT_TEMPLATES["NO_TEAM"]
@@ -162,32 +570,46 @@ class TTSManager:
     def generate_initial_audio(self, game_data):
         if not self.is_ready: return
         self.game_data = game_data
+        self._regenerated.clear()
         if OVERWRITE_EXISTING_TTS:
             self._clear_cache()
         
-        initial_jobs = [(game_data["teams_greating"], os.path.join(self.output_dir, "teams_greating.wav"))]
-        initial_jobs.append(self._generate_no_team_announcement(game_data))
+        no_team_text, no_team_path = self._generate_no_team_announcement(game_data)
+        texts = [game_data["teams_greating"], no_team_text]
+        paths = [f"{self._out}teams_greating.wav", no_team_path]
+        # The greeting plays first; the no-team line only on a misheard team name
+        priorities = [0, JOB_PRIORITY["fun_fact"]]
         for i, round_data in enumerate(game_data["rounds"]):
             if i < INITIAL_QUESTION_COUNT:
-                initial_jobs.extend(self._get_jobs_for_round(round_data))
-        log.info(f"Starting initial TTS generation for {len(initial_jobs)} audio files...")
-        self._run_generation_jobs(initial_jobs)
+                self._get_jobs_for_round(round_data, texts, paths, priorities)
+        # Dispatch by priority band across all rounds (stable, so rounds keep their order
+        # within a band); the executor runs jobs FIFO, so critical lines finish first.
+        order = sorted(range(len(texts)), key=priorities.__getitem__)
+        texts = [texts[i] for i in order]
+        paths = [paths[i] for i in order]
+        log.info(f"Starting initial TTS generation for {len(texts)} audio files...")
+        self._run_generation_jobs(texts, paths)
+        self._refresh_generated()
         log.info("Initial TTS generation complete.")
 
     def generate_remaining_audio(self):
         if not self.is_ready or not self.game_data: return
-        remaining_jobs = []
+        texts, paths = [], []
         for i, round_data in enumerate(self.game_data["rounds"]):
             if i >= INITIAL_QUESTION_COUNT:
-                remaining_jobs.extend(self._get_jobs_for_round(round_data))
-        if not remaining_jobs: return
+                self._get_jobs_for_round(round_data, texts, paths)
+        if not texts: return
         
-        log.info(f"Starting background generation for {len(remaining_jobs)} remaining audio files...")
+        log.info(f"Starting background generation for {len(texts)} remaining audio files...")
+        texts, paths = self._filter_existing(texts, paths)
         if FORCE_SYNC_TTS_GENERATION:
             log.debug("Forcing synchronous generation for testing.")
-            self._run_generation_jobs(remaining_jobs)
+            self._run_generation_jobs(texts, paths)
         else:
-            threading.Thread(target=self._run_generation_jobs, args=(remaining_jobs,), daemon=True).start()
+            futures = [self._executor.submit(self._generate_speech_group, text, group, True)
+                       for text, group in self._group_by_text(texts, paths).items()]
+            if futures:
+                self._save_text_cache_when_done(futures)
 
     def regenerate_round_audio(self, question_id):
         """
@@ -198,14 +620,29 @@ class TTSManager:
         for round_data in self.game_data["rounds"]:
             if round_data["id"] == question_id:
                 log.warn(f"Regenerating audio for question ID: {question_id}")
-                jobs = self._get_jobs_for_round(round_data)
-                self._run_generation_jobs(jobs)
+                texts, paths = [], []
+                self._get_jobs_for_round(round_data, texts, paths)
+                self._regenerated.difference_update(paths)
+                self._run_generation_jobs(texts, paths, self._regen_executor)
+                self._regenerated.update(p for p in paths if os.path.basename(p) in self._generated)
                 return
         log.error(f"Could not find round with ID {question_id} to regenerate audio.")
 
+    def shutdown(self):
+        """
+        Drops queued jobs and makes running ones abandon their rate-limit waits
+        and retry sleeps, so exit waits at most for one in-flight RPC, itself
+        bounded by TTS_REQUEST_TIMEOUT.
+        """
+        self._stopping.set()
+        with self._concurrency_cond:
+            self._concurrency_cond.notify_all()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._regen_executor.shutdown(wait=False, cancel_futures=True)
+        log.info("TTS executor shut down.")
+
     def _get_audio_path(self, filename):
-        filepath = os.path.join(self.output_dir, filename)
-        return filepath if os.path.exists(filepath) else ""
+        return f"{self._out}{filename}" if filename in self._generated else ""
 
     def get_greeting_audio(self):
         return self._get_audio_path("teams_greating.wav")
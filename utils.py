@@ -1,38 +1,109 @@
 import os
+import sched
+import time
+import queue
 import threading
+from collections import defaultdict
 from logger import log
 from config import REQUIRED_AUDIO_ASSETS
 
-class Timer(threading.Thread):
-    def __init__(self, interval, callback, recurring=False):
-        super().__init__()
+# All timers share one scheduler thread instead of each owning a sleeping thread.
+# Callbacks run on a few reusable worker threads rather than on the scheduler
+# thread itself. That pool is only for short callbacks (e.g. the UI tick): a
+# callback that blocks, such as one playing audio or driving game state, must be
+# created with blocking=True so it fires on a thread of its own instead.
+TIMER_CALLBACK_WORKERS = 4
+
+_wakeup = threading.Event()
+
+def _wait(delay):
+    """Sleeps up to delay seconds, returning early when a new timer is scheduled."""
+    if _wakeup.wait(delay):
+        _wakeup.clear()
+
+_scheduler = sched.scheduler(time.monotonic, _wait)
+_callbacks = queue.Queue()
+_started = False
+_start_lock = threading.Lock()
+
+def _run_scheduler():
+    while True:
+        _scheduler.run()
+        _wakeup.wait() # Queue is empty; sleep until a timer is scheduled
+        _wakeup.clear()
+
+def _run_callbacks():
+    while True:
+        timer = _callbacks.get()
+        timer._fire()
+
+def _ensure_scheduler():
+    global _started
+    with _start_lock:
+        if _started:
+            return
+        threading.Thread(target=_run_scheduler, name="timer-scheduler", daemon=True).start()
+        for i in range(TIMER_CALLBACK_WORKERS):
+            threading.Thread(target=_run_callbacks, name=f"timer-callback-{i}", daemon=True).start()
+        _started = True
+
+class Timer:
+    def __init__(self, interval, callback, recurring=False, blocking=False):
         self.interval = interval
         self.callback = callback
         self.recurring = recurring
+        self.blocking = blocking
         self.stopped = threading.Event()
-        self.daemon = True
+        self._event = None
 
-    def run(self):
-        while not self.stopped.wait(self.interval):
-            self.callback()
-            if not self.recurring:
-                self.stop()
+    def start(self):
+        _ensure_scheduler()
+        self._schedule()
+
+    def _schedule(self):
+        dispatch = self._fire_in_thread if self.blocking else _callbacks.put
+        self._event = _scheduler.enter(self.interval, 0, dispatch, argument=(self,))
+        _wakeup.set() # The new deadline may be earlier than the one being waited on
+
+    @staticmethod
+    def _fire_in_thread(timer):
+        threading.Thread(target=timer._fire, name="timer-blocking", daemon=True).start()
+
+    def _fire(self):
+        if self.stopped.is_set():
+            return
+        self.callback()
+        if self.recurring and not self.stopped.is_set():
+            self._schedule()
+        else:
+            self.stop()
 
     def stop(self):
         self.stopped.set()
+        if self._event is not None:
+            try:
+                _scheduler.cancel(self._event)
+            except ValueError:
+                pass # Already fired
+            self._event = None
 
     def is_running(self):
         return not self.stopped.is_set()
 
 def check_audio_assets():
     """
-    Checks for the existence of all required audio files.
+    Checks for the existence of all required audio files, listing each
+    asset directory once instead of stat-ing every file.
     """
     log.info("Checking for required audio assets...")
-    missing_files = []
+    by_dir = defaultdict(set)
     for asset_path in REQUIRED_AUDIO_ASSETS:
-        if not os.path.exists(asset_path):
-            missing_files.append(asset_path)
+        by_dir[os.path.dirname(asset_path)].add(os.path.basename(asset_path))
+
+    missing_files = []
+    for directory, names in by_dir.items():
+        present = {entry.name for entry in os.scandir(directory)} if os.path.isdir(directory) else set()
+        missing_files.extend(os.path.join(directory, name) for name in sorted(names - present))
     
     if missing_files:
         log.error("The following required audio assets are missing:")
@@ -1,7 +1,6 @@
 from flask import Flask, render_template, request, redirect, url_for, flash
 from flask_socketio import SocketIO
 import threading
-import time
 import socket
 from logger import log
 from . import network_manager as net
@@ -9,10 +8,18 @@ from config import WEB_PORT
 
 app = Flask(__name__)
 app.secret_key = 'pi_trivia_secret_key'
+# Threading mode keeps the server compatible with the gRPC and audio threads in the
+# same process; simple-websocket lets clients upgrade from long-polling to WebSocket.
 socketio = SocketIO(app, async_mode='threading')
 
 game_is_ready = False
 
+GAME_UPDATE_FLUSH_INTERVAL = 0.03 # Seconds; updates arriving within this window go out as one frame
+_pending_update = {}
+_pending_lock = threading.Lock()
+_pending_event = threading.Event() # Wakes the flusher when an update is pending
+_flusher_started = False
+
 @app.route('/')
 def index():
     if not net.is_connected():
@@ -30,20 +37,24 @@ def setup():
         if not ssid or not password:
             flash('SSID and password cannot be empty.', 'error')
             return redirect(url_for('setup'))
-        log.info(f"Received network credentials for SSID: {ssid}")
-        if net.connect_to_wifi(ssid, password):
-            flash('Successfully connected to WiFi!', 'success')
-            time.sleep(5)
-            hostname = socket.gethostname()
-            return f"<h1>Connection Successful!</h1><p>Please connect your computer back to your main WiFi network and access the device at <a href='http://{hostname}.local:{WEB_PORT}'>http://{hostname}.local:{WEB_PORT}</a> or its new IP address.</p>"
-        else:
-            flash('Failed to connect. Please check your credentials and try again.', 'error')
-            net.start_hotspot()
+        ssid = net.sanitize_ssid(ssid)
+        if ssid is None:
+            flash('That network name is not a valid SSID.', 'error')
             return redirect(url_for('setup'))
+        log.info(f"Received network credentials for SSID: {ssid}")
+        # Answer before the hotspot goes down; the attempt finishes in the background
+        net.submit_connect(ssid, password, delay=1).add_done_callback(_on_connect_done)
+        hostname = socket.gethostname()
+        return f"<h1>Connecting...</h1><p>The setup hotspot will disconnect while the device joins your network. Please connect your computer back to your main WiFi network and access the device at <a href='http://{hostname}.local:{WEB_PORT}'>http://{hostname}.local:{WEB_PORT}</a> or its new IP address.</p><p>If the connection fails, the '{net.HOTSPOT_SSID}' hotspot will come back so you can try again.</p>"
     
     current_ssid = net.get_current_ssid()
     return render_template('setup.html', current_ssid=current_ssid)
 
+def _on_connect_done(future):
+    if future.exception() is not None or not future.result():
+        log.error("WiFi connection attempt failed. Restarting hotspot.")
+        net.start_hotspot()
+
 def run_web_server():
     log.info(f"Starting Flask-SocketIO web server on port {WEB_PORT}...")
     socketio.run(app, host='0.0.0.0', port=WEB_PORT, debug=False, allow_unsafe_werkzeug=True)
@@ -60,6 +71,31 @@ def set_game_ready_status(is_ready):
     if is_ready:
         socketio.emit('game_ready')
 
+def _game_update_flusher():
+    """Long-lived loop that sends each burst of merged updates as one frame."""
+    while True:
+        _pending_event.wait()
+        socketio.sleep(GAME_UPDATE_FLUSH_INTERVAL) # Let the rest of the burst arrive
+        with _pending_lock:
+            _pending_event.clear()
+            data = dict(_pending_update)
+            _pending_update.clear()
+        if data:
+            socketio.emit('game_update', data)
+
 def emit_game_update(data):
-    """Emits a game state update to all connected clients."""
-    socketio.emit('game_update', data)
+    """
+    Emits a game state update to all connected clients. Updates sent in quick
+    succession are merged and flushed as a single frame after a short delay.
+    """
+    global _flusher_started
+    with _pending_lock:
+        if not _flusher_started:
+            threading.Thread(target=_game_update_flusher, name="game-update-flusher", daemon=True).start()
+            _flusher_started = True
+        # The client clears the timer when an update has no time_left, so a
+        # later update without it must drop any pending value to keep that effect.
+        if 'time_left' not in data:
+            _pending_update.pop('time_left', None)
+        _pending_update.update(data)
+        _pending_event.set()
@@ -2,101 +2,525 @@
 network_manager.py
 ------------------
 Handles WiFi connectivity for the Pi, switching between client mode and
-acting as a temporary hotspot for configuration. Uses nmcli for modern
-Raspberry Pi OS compatibility.
+acting as a temporary hotspot for configuration. Talks to NetworkManager
+directly over D-Bus, falling back to nmcli when D-Bus is unavailable.
 """
 
+import re
 import subprocess
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from uuid import uuid4
 from logger import log
 
+# Attempt to import dbus-python (python3-dbus on Raspberry Pi OS).
+# If it fails, every operation falls back to spawning nmcli.
+try:
+    import dbus
+    HAS_DBUS = True
+except ImportError:
+    log.warn("dbus-python not found. Network manager will fall back to nmcli.")
+    HAS_DBUS = False
+
+# A GLib main loop lets connect_to_wifi wait on NM signals instead of polling.
+HAS_GLIB = False
+if HAS_DBUS:
+    try:
+        from dbus.mainloop.glib import DBusGMainLoop
+        from gi.repository import GLib
+        DBusGMainLoop(set_as_default=True)
+        HAS_GLIB = True
+    except ImportError:
+        log.warn("GLib not found. Connection verification will poll instead.")
+
 HOTSPOT_SSID = "MIG_Labs"
 HOTSPOT_PASSWORD = "password"
+HOTSPOT_CONNECTION_ID = "MIG_Labs_hotspot"
+WIFI_INTERFACE = "wlan0"
+
+NM_BUS_NAME = "org.freedesktop.NetworkManager"
+NM_PATH = "/org/freedesktop/NetworkManager"
+NM_IFACE = "org.freedesktop.NetworkManager"
+NM_SETTINGS_PATH = "/org/freedesktop/NetworkManager/Settings"
+NM_SETTINGS_IFACE = "org.freedesktop.NetworkManager.Settings"
+NM_CONNECTION_IFACE = "org.freedesktop.NetworkManager.Settings.Connection"
+NM_ACTIVE_IFACE = "org.freedesktop.NetworkManager.Connection.Active"
+NM_AP_IFACE = "org.freedesktop.NetworkManager.AccessPoint"
+NM_DEVICE_IFACE = "org.freedesktop.NetworkManager.Device"
+DBUS_PROPS_IFACE = "org.freedesktop.DBus.Properties"
+NM_STATE_CONNECTED_GLOBAL = 70
+NM_ACTIVE_STATE_ACTIVATED = 2
+NM_ACTIVE_STATE_DEACTIVATED = 4
+NM_DEVICE_STATE_DISCONNECTED = 30
+NM_DEVICE_STATE_FAILED = 120
+CONNECT_TIMEOUT_SEC = 10
+
+# nmcli timeouts by command class, so a hung status query can't stall a web request
+QUERY_CMD_TIMEOUT_SEC = 3
+CONNECT_CMD_TIMEOUT_SEC = 30
+HOTSPOT_CMD_TIMEOUT_SEC = 60
+
+STATUS_REFRESH_SEC = 5 # How often the background thread re-reads connectivity and SSID (D-Bus only)
+STATUS_TTL_SEC = 1.0 # Without D-Bus, how long an on-demand nmcli answer is reused
+
+_bus = None
+_status = {'connected': False, 'ssid': None}
+_status_times = {'connected': 0.0, 'ssid': 0.0} # When each value was last read
+_status_lock = threading.Lock()
+_refresh_now = threading.Event()
+_refresher_running = False
+_missing_commands = set() # Executables already reported as not installed
+_profile_uuids = {} # (ssid, mode) -> UUID of the saved NetworkManager profile
+_HOTSPOT_UUID = None # Set once the persistent hotspot profile exists
+
+# Connection attempts run here so web handlers can return while NM does the work
+_connect_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="wifi-connect")
+
+def _invalidate_status_cache():
+    """Forces the next read to be fresh and wakes the refresher, if running, to re-read now."""
+    with _status_lock:
+        _status_times.update(connected=0.0, ssid=0.0)
+    _refresh_now.set()
+
+def _store_status(**values):
+    now = time.monotonic()
+    with _status_lock:
+        _status.update(values)
+        _status_times.update({key: now for key in values})
+
+def _refresh_status():
+    _store_status(connected=_query_connected(), ssid=_query_current_ssid())
+
+def _status_refresher():
+    while True:
+        _refresh_now.wait(STATUS_REFRESH_SEC)
+        _refresh_now.clear()
+        try:
+            _refresh_status()
+        except Exception as e:
+            log.error(f"Failed to refresh network status: {e}")
+
+def start_status_refresher():
+    """
+    Reads the network status once and, when D-Bus is available, keeps it fresh
+    from a background thread so status calls are plain dictionary reads.
+    Without D-Bus every refresh would spawn nmcli, so status is instead read
+    on demand behind a short TTL. Called by main() at startup.
+    """
+    global _refresher_running
+    if _refresher_running or not HAS_DBUS:
+        return
+    try:
+        _refresh_status()
+    except Exception as e:
+        log.error(f"Failed to read initial network status: {e}")
+    threading.Thread(target=_status_refresher, name="network-status", daemon=True).start()
+    _refresher_running = True
+
+def _read_status(key):
+    with _status_lock:
+        if _refresher_running or time.monotonic() - _status_times[key] < STATUS_TTL_SEC:
+            return _status[key]
+    query = _query_connected if key == 'connected' else _query_current_ssid
+    value = query()
+    _store_status(**{key: value})
+    return value
+
+def _get_bus():
+    """Returns the cached system bus connection, opening it on first use."""
+    global _bus
+    if _bus is None:
+        _bus = dbus.SystemBus()
+    return _bus
+
+def _nm_get(path, interface, prop):
+    """Reads a single D-Bus property from a NetworkManager object."""
+    obj = _get_bus().get_object(NM_BUS_NAME, path)
+    return dbus.Interface(obj, DBUS_PROPS_IFACE).Get(interface, prop)
+
+def _nm():
+    """Returns the NetworkManager root interface."""
+    return dbus.Interface(_get_bus().get_object(NM_BUS_NAME, NM_PATH), NM_IFACE)
+
+def _wifi_device_path():
+    return _nm().GetDeviceByIpIface(WIFI_INTERFACE)
+
+def _nm_settings():
+    return dbus.Interface(_get_bus().get_object(NM_BUS_NAME, NM_SETTINGS_PATH), NM_SETTINGS_IFACE)
+
+def _nm_connection(path):
+    return dbus.Interface(_get_bus().get_object(NM_BUS_NAME, path), NM_CONNECTION_IFACE)
+
+def _find_connection(ssid, mode):
+    """Returns the path of a saved WiFi profile for ssid in the given mode, or None."""
+    key = (ssid, mode)
+    if key in _profile_uuids:
+        try:
+            return _nm_settings().GetConnectionByUuid(_profile_uuids[key])
+        except dbus.DBusException:
+            del _profile_uuids[key] # Profile was removed since it was cached
+    for path in _nm_settings().ListConnections():
+        settings = _nm_connection(path).GetSettings()
+        wireless = settings.get('802-11-wireless')
+        if not wireless:
+            continue
+        if bytes(wireless.get('ssid', b'')).decode('utf-8', errors='replace') != ssid:
+            continue
+        if wireless.get('mode', 'infrastructure') == mode:
+            _profile_uuids[key] = str(settings['connection']['uuid'])
+            return path
+    return None
+
+def _save_connection(settings):
+    """Writes settings to the saved profile for the same SSID and mode, creating it if needed."""
+    wireless = settings['802-11-wireless']
+    key = (bytes(wireless['ssid']).decode(), wireless['mode'])
+    path = _find_connection(*key)
+    if path:
+        settings['connection']['uuid'] = _profile_uuids[key]
+        _nm_connection(path).Update(settings)
+        return path
+    settings['connection']['uuid'] = str(uuid4())
+    path = _nm_settings().AddConnection(settings)
+    _profile_uuids[key] = settings['connection']['uuid']
+    return path
+
+def _dbus_activate(path):
+    """
+    Activates a saved profile on the WiFi device. NetworkManager deactivates
+    whatever was running on the device in the same call.
+    """
+    return _nm().ActivateConnection(path, _wifi_device_path(), "/")
+
+def _dbus_activate_and_wait(path):
+    active_path = _dbus_activate(path)
+    if HAS_GLIB:
+        return _wait_for_activation(active_path)
+    return _poll_connected()
+
+def _poll_connected():
+    """Polls connectivity for a few seconds when activation can't be awaited directly."""
+    for _ in range(5):
+        time.sleep(2)
+        if _query_connected():
+            return True
+        if _wifi_device_failed():
+            log.warn(f"{WIFI_INTERFACE} dropped out of activation; not waiting any longer.")
+            return False
+    return False
+
+def _wifi_device_failed():
+    """True when the WiFi device has failed or fallen back to disconnected."""
+    state = None
+    if HAS_DBUS:
+        try:
+            state = _nm_get(_wifi_device_path(), NM_DEVICE_IFACE, 'State')
+        except dbus.DBusException:
+            pass
+    if state is None:
+        output = _run_command(['nmcli', '-g', 'GENERAL.STATE', 'device', 'show', WIFI_INTERFACE],
+                              check=False, timeout=QUERY_CMD_TIMEOUT_SEC)
+        code = (output or '').partition(' ')[0]
+        state = int(code) if code.isdigit() else None
+    return state in (NM_DEVICE_STATE_DISCONNECTED, NM_DEVICE_STATE_FAILED)
+
+def _wait_for_activation(active_path, timeout=CONNECT_TIMEOUT_SEC):
+    """
+    Blocks until the active connection reports ACTIVATED (True), DEACTIVATED
+    (False), or the timeout elapses (False), driven by its StateChanged signal.
+    """
+    loop = GLib.MainLoop()
+    result = {'ok': False, 'timed_out': False}
+
+    def on_timeout():
+        result['timed_out'] = True
+        loop.quit()
+        return False # One-shot; GLib destroys the source itself
+
+    def on_state_changed(state, reason):
+        if state == NM_ACTIVE_STATE_ACTIVATED:
+            result['ok'] = True
+            loop.quit()
+        elif state == NM_ACTIVE_STATE_DEACTIVATED:
+            log.warn(f"Connection deactivated while activating (reason {reason}).")
+            loop.quit()
+
+    match = _get_bus().add_signal_receiver(
+        on_state_changed, signal_name='StateChanged',
+        dbus_interface=NM_ACTIVE_IFACE, path=active_path)
+    timeout_id = GLib.timeout_add_seconds(timeout, on_timeout)
+    try:
+        # The state may have settled before the receiver was registered
+        state = _nm_get(active_path, NM_ACTIVE_IFACE, 'State')
+        if state == NM_ACTIVE_STATE_ACTIVATED:
+            return True
+        if state == NM_ACTIVE_STATE_DEACTIVATED:
+            return False
+        loop.run()
+        return result['ok']
+    finally:
+        if not result['timed_out']:
+            GLib.source_remove(timeout_id)
+        match.remove()
+
+def _wifi_settings(ssid, password):
+    return {
+        'connection': {'type': '802-11-wireless', 'id': ssid},
+        '802-11-wireless': {'ssid': dbus.ByteArray(ssid.encode()), 'mode': 'infrastructure'},
+        '802-11-wireless-security': {'key-mgmt': 'wpa-psk', 'psk': password},
+    }
+
+def _hotspot_settings():
+    return {
+        'connection': {'type': '802-11-wireless', 'id': HOTSPOT_CONNECTION_ID, 'autoconnect': False},
+        '802-11-wireless': {'ssid': dbus.ByteArray(HOTSPOT_SSID.encode()), 'mode': 'ap', 'band': 'bg'},
+        '802-11-wireless-security': {'key-mgmt': 'wpa-psk', 'psk': HOTSPOT_PASSWORD},
+        'ipv4': {'method': 'shared'},
+        'ipv6': {'method': 'ignore'},
+    }
+
+SSID_PATTERN = re.compile(r'^[^\x00\n\r]+$')
+SSID_MAX_BYTES = 32
+
+def sanitize_ssid(ssid):
+    """Returns ssid with surrounding whitespace removed, or None if it can't be a valid SSID."""
+    ssid = ssid.strip()
+    if not SSID_PATTERN.match(ssid) or len(ssid.encode('utf-8')) > SSID_MAX_BYTES:
+        return None
+    return ssid
 
-def _run_command(command, check=True):
-    """Executes a shell command and returns its output."""
+def _run_command(command, check=True, timeout=120, capture=True):
+    """
+    Executes a shell command and returns its output. With capture=False stdout
+    is discarded and an empty string is returned on success.
+    """
     try:
         log.debug(f"Running command: {' '.join(command)}")
         result = subprocess.run(
             command,
-            capture_output=True,
-            text=True,
+            stdout=subprocess.PIPE if capture else subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=capture,
             check=check,
-            timeout=120  # Increased timeout for network operations
+            timeout=timeout
         )
+        if not capture:
+            log.debug("Command successful.")
+            return ""
         log.debug(f"Command successful. Output: {result.stdout.strip()}")
         return result.stdout.strip()
     except subprocess.CalledProcessError as e:
+        stderr = e.stderr if capture else e.stderr.decode(errors='replace')
         log.error(f"Command failed: {' '.join(command)}")
-        log.error(f"Stderr: {e.stderr.strip()}")
+        log.error(f"Stderr: {stderr.strip()}")
         return None
     except subprocess.TimeoutExpired:
         log.error(f"Command timed out: {' '.join(command)}")
         return None
+    except FileNotFoundError:
+        # Report a missing tool once; the status refresher would otherwise repeat it forever
+        if command[0] not in _missing_commands:
+            _missing_commands.add(command[0])
+            log.error(f"Command not found: {command[0]}. Is it installed?")
+        return None
 
 def is_connected():
     """Checks if the Pi is connected to any WiFi network."""
-    log.info("Checking for active WiFi connection...")
-    # Use `nmcli g` for a simpler, more reliable status check
-    output = _run_command(['nmcli', '-t', '-f', 'STATE', 'g'])
-    if output == "connected":
+    if _read_status('connected'):
         log.info("WiFi is connected.")
         return True
     log.info("WiFi is not connected.")
     return False
 
+def _is_hotspot(name, uuid):
+    # 'Hotspot' is the profile nmcli's own `d wifi hotspot` creates
+    if uuid is not None and uuid == _HOTSPOT_UUID:
+        return True
+    return name in (HOTSPOT_CONNECTION_ID, 'Hotspot')
+
+def _dbus_wifi_connected():
+    if _nm_get(NM_PATH, NM_IFACE, 'State') != NM_STATE_CONNECTED_GLOBAL:
+        return False
+    for active_path in _nm_get(NM_PATH, NM_IFACE, 'ActiveConnections'):
+        if _nm_get(active_path, NM_ACTIVE_IFACE, 'Type') != '802-11-wireless':
+            continue
+        if _nm_get(active_path, NM_ACTIVE_IFACE, 'State') != NM_ACTIVE_STATE_ACTIVATED:
+            continue
+        name = str(_nm_get(active_path, NM_ACTIVE_IFACE, 'Id'))
+        if not _is_hotspot(name, str(_nm_get(active_path, NM_ACTIVE_IFACE, 'Uuid'))):
+            return True
+    return False
+
+def _query_connected():
+    """True only for an activated WiFi client connection; wired links and the hotspot don't count."""
+    if HAS_DBUS:
+        try:
+            return _dbus_wifi_connected()
+        except dbus.DBusException as e:
+            log.warn(f"D-Bus state query failed, falling back to nmcli: {e}")
+    # Reports NM's last known connectivity without loading device state or rescanning
+    if _run_command(['nmcli', 'networking', 'connectivity'], timeout=QUERY_CMD_TIMEOUT_SEC) != "full":
+        return False
+    # Asking the WiFi device directly leaves wired connections out without any type filtering
+    output = _run_command(['nmcli', '-g', 'GENERAL.STATE,GENERAL.CONNECTION', 'device', 'show', WIFI_INTERFACE],
+                          timeout=QUERY_CMD_TIMEOUT_SEC)
+    state, _, name = (output or '').partition('\n')
+    return state.startswith('100') and bool(name) and not _is_hotspot(name.replace('\\:', ':'), None)
+
+def _dbus_current_ssid():
+    for active_path in _nm_get(NM_PATH, NM_IFACE, 'ActiveConnections'):
+        if _nm_get(active_path, NM_ACTIVE_IFACE, 'Type') != '802-11-wireless':
+            continue
+        ap_path = _nm_get(active_path, NM_ACTIVE_IFACE, 'SpecificObject')
+        if ap_path and ap_path != "/":
+            ssid = _nm_get(ap_path, NM_AP_IFACE, 'Ssid')
+            return bytes(ssid).decode('utf-8', errors='replace')
+        return str(_nm_get(active_path, NM_ACTIVE_IFACE, 'Id'))
+    return None
+
 def get_current_ssid():
     """Gets the SSID of the currently connected WiFi network."""
-    output = _run_command(['nmcli', '-t', '-f', 'NAME,TYPE', 'c', 'show', '--active'])
-    if output:
-        for line in output.splitlines():
-            if 'wifi' in line:
-                return line.split(':')[0].strip()
-    return None
+    return _read_status('ssid')
+
+def _query_current_ssid():
+    if HAS_DBUS:
+        try:
+            return _dbus_current_ssid()
+        except dbus.DBusException as e:
+            log.warn(f"D-Bus SSID query failed, falling back to nmcli: {e}")
+    # -g prints just the value: the name of the connection on the WiFi device, if any
+    output = _run_command(['nmcli', '-g', 'GENERAL.CONNECTION', 'device', 'show', WIFI_INTERFACE],
+                          timeout=QUERY_CMD_TIMEOUT_SEC)
+    return output.replace('\\:', ':') if output else None
+
+def _ensure_hotspot_profile():
+    """
+    Returns the path of the saved hotspot profile, creating it on the first
+    start_hotspot() rather than on import, so importing never alters NM config.
+    """
+    global _HOTSPOT_UUID
+    path = _find_connection(HOTSPOT_SSID, 'ap')
+    if path is None:
+        log.info(f"Creating hotspot profile '{HOTSPOT_CONNECTION_ID}'.")
+        path = _save_connection(_hotspot_settings())
+    _HOTSPOT_UUID = _profile_uuids[(HOTSPOT_SSID, 'ap')]
+    return path
 
 def start_hotspot():
     """Starts a temporary WiFi hotspot for configuration."""
     log.info(f"Attempting to start hotspot with SSID: {HOTSPOT_SSID}")
-    
-    # Disconnect from any existing network
-    _run_command(['nmcli', 'd', 'disconnect', 'wlan0'], check=False)
-    time.sleep(2)
-
-    # Use the direct hotspot command
-    command = [
-        'nmcli', 'd', 'wifi', 'hotspot', 'ifname', 'wlan0',
-        'ssid', HOTSPOT_SSID, 'password', HOTSPOT_PASSWORD
-    ]
-    if _run_command(command) is not None:
+    _invalidate_status_cache()
+
+    if HAS_DBUS:
+        try:
+            _dbus_activate(_ensure_hotspot_profile())
+            _invalidate_status_cache()
+            log.info("Hotspot started successfully.")
+            return True
+        except dbus.DBusException as e:
+            log.warn(f"D-Bus hotspot activation failed, falling back to nmcli: {e}")
+
+    if _HOTSPOT_UUID:
+        command = ['nmcli', 'connection', 'up', 'uuid', _HOTSPOT_UUID]
+    else:
+        # Use the direct hotspot command
+        command = [
+            'nmcli', 'd', 'wifi', 'hotspot', 'ifname', 'wlan0',
+            'ssid', HOTSPOT_SSID, 'password', HOTSPOT_PASSWORD
+        ]
+    if _run_command(command, timeout=HOTSPOT_CMD_TIMEOUT_SEC, capture=False) is not None:
+        _invalidate_status_cache()
         log.info("Hotspot started successfully.")
         return True
     
     log.error("Failed to start hotspot.")
     return False
 
-def connect_to_wifi(ssid, password):
-    """Attempts to connect to a new WiFi network with verification."""
-    log.info(f"Attempting to connect to SSID: {ssid}")
-    
-    # Disconnect from any current network (including a potential hotspot)
-    _run_command(['nmcli', 'd', 'disconnect', 'wlan0'], check=False)
-    time.sleep(2)
+def _dbus_connect(ssid, password):
+    path = _find_connection(ssid, 'infrastructure')
+    if path:
+        log.info(f"Activating saved profile for '{ssid}'.")
+        if _dbus_activate_and_wait(path):
+            return True
+        log.warn(f"Saved profile for '{ssid}' did not connect; retrying with the supplied password.")
+    return _dbus_activate_and_wait(_save_connection(_wifi_settings(ssid, password)))
+
+def _nmcli_profile_uuid(ssid):
+    key = (ssid, 'infrastructure')
+    if key in _profile_uuids:
+        return _profile_uuids[key]
+    output = _run_command(['nmcli', '-t', '-f', 'NAME,UUID,TYPE', 'connection', 'show'],
+                          timeout=QUERY_CMD_TIMEOUT_SEC)
+    for line in (output or '').splitlines():
+        name, uuid, conn_type = line.rsplit(':', 2)
+        # Profiles created by `nmcli dev wifi connect` are named after the SSID
+        if conn_type == '802-11-wireless' and name.replace('\\:', ':') == ssid:
+            _profile_uuids[key] = uuid
+            return uuid
+    return None
+
+def _nmcli_connect(ssid, password):
+    uuid = _nmcli_profile_uuid(ssid)
+    if uuid:
+        log.info(f"Activating saved profile for '{ssid}'.")
+        if _run_command(['nmcli', 'connection', 'up', 'uuid', uuid],
+                                  timeout=CONNECT_CMD_TIMEOUT_SEC, capture=False) is not None and _poll_connected():
+            return True
+        _profile_uuids.pop((ssid, 'infrastructure'), None)
+        log.warn(f"Saved profile for '{ssid}' did not connect; retrying with the supplied password.")
 
     # Use the direct connect command
     connect_command = [
         'nmcli', 'dev', 'wifi', 'connect', ssid, 'password', password
     ]
-    
-    if _run_command(connect_command) is None:
-        log.error(f"Failed to connect to '{ssid}'. The network may be out of range or the password may be incorrect.")
+    if _run_command(connect_command, timeout=CONNECT_CMD_TIMEOUT_SEC, capture=False) is None:
         return False
+    return _poll_connected()
 
-    # Verify connection status for a few seconds
-    for _ in range(5):
-        time.sleep(2)
-        if is_connected():
-            log.info(f"Successfully connected to '{ssid}'.")
-            return True
-            
-    log.error(f"Failed to verify connection to '{ssid}' after connecting.")
+def connect_to_wifi(ssid, password):
+    """Attempts to connect to a WiFi network, reusing its saved profile when one exists."""
+    clean_ssid = sanitize_ssid(ssid)
+    if clean_ssid is None:
+        log.error(f"Refusing to connect to invalid SSID: {ssid!r}")
+        return False
+    ssid = clean_ssid
+    if get_current_ssid() == ssid and is_connected():
+        log.info(f"Already connected to '{ssid}'.")
+        return True
+    log.info(f"Attempting to connect to SSID: {ssid}")
+    _invalidate_status_cache()
+
+    connected = None
+    if HAS_DBUS:
+        try:
+            connected = _dbus_connect(ssid, password)
+        except dbus.DBusException as e:
+            log.warn(f"D-Bus activation failed, falling back to nmcli: {e}")
+    if connected is None:
+        connected = _nmcli_connect(ssid, password)
+    _invalidate_status_cache()
+
+    if connected:
+        log.info(f"Successfully connected to '{ssid}'.")
+        return True
+    log.error(f"Failed to connect to '{ssid}'. The network may be out of range or the password may be incorrect.")
     return False
+
+def submit_connect(ssid, password, delay=0):
+    """
+    Starts connect_to_wifi in the background and returns a Future for its result.
+    A delay gives the caller time to finish talking to clients on the current network.
+    """
+    def run():
+        time.sleep(delay)
+        return connect_to_wifi(ssid, password)
+    return _connect_executor.submit(run)
+
+def wait_connect(future, timeout=None):
+    """Blocks on a submit_connect Future, treating a timeout as a failed connection."""
+    try:
+        return future.result(timeout)
+    except FutureTimeoutError:
+        log.warn("Timed out waiting for the WiFi connection attempt.")
+        return False